@@ -6,7 +6,6 @@ Entrypoint for get_user_code
 import sys
 import os
 import argparse
-from . import get_user_code
 from logger import Logger
 import config
 import toolbox
@@ -24,35 +23,36 @@ def arg_parse() -> dict:
         "in QCII, and device code and code_verifier required for use "
         "when running the qiagen_upload module"
     )
-    try:
-        parser = argparse.ArgumentParser(
-            description=info_string,
-            usage=info_string,
-        )
-        requirednamed = parser.add_argument_group("Required named arguments")
-        requirednamed.add_argument(
-            "-CI",
-            "--client_id",
-            type=str,
-            help="Client ID provided by Qiagen",
-            required=True,
-        )
-        return vars(parser.parse_args())
-    except Exception as exception:
-        logger.exception(
-            f"An exception was encountered when parsing command line arguments: {exception}",
-        )
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description=info_string,
+        usage=info_string,
+    )
+    requirednamed = parser.add_argument_group("Required named arguments")
+    requirednamed.add_argument(
+        "-CI",
+        "--client_id",
+        type=str,
+        help="Client ID provided by Qiagen",
+        required=True,
+    )
+    return vars(parser.parse_args())
 
 
 args = arg_parse()
+
+from . import get_user_code  # noqa: E402 - imported after parsing so --help stays fast
+
 outdir = os.path.join(os.getcwd(), "outputs")
+os.makedirs(outdir, exist_ok=True)
 logfile_path = os.path.join(outdir, f"get_user_code_{config.TIMESTAMP}.log")
 logger = Logger(logfile_path).logger
 
-if not os.path.isdir(outdir):
-    os.mkdir(outdir)
-
 logger.info("Running qiagen_upload %s - get_user_code", toolbox.git_tag())
 
-get_user_code.GetUserCode(args["client_id"], outdir, logger)
+try:
+    get_user_code.GetUserCode(args["client_id"], outdir, logger, toolbox.http_session())
+except Exception as exception:
+    logger.exception(
+        "An exception was encountered when running get_user_code: %s", exception
+    )
+    sys.exit(1)
@@ -6,11 +6,17 @@ code_verifier required for use when running the qiagen_upload module
 """
 import sys
 import os
-import pkce
+import base64
+import hashlib
+import secrets
+import requests
 import config
 import logging
 import toolbox
 
+# Qiagen API endpoint used to generate the user and device code
+DEVICE_CODE_URL = "https://apps.qiagenbioinformatics.eu/qiaoauth/oauth/device/code"
+
 
 class GetUserCode:
     """
@@ -21,11 +27,10 @@ class GetUserCode:
         client_id (str):            The client for which the code is requested
                                     (provided by QIAGEN)
         logger (object):            Python logging object
+        session (requests.Session): Session used to make the API calls
         code_verifier (str):        A high-entropy cryptographic random string
         code_challenge (str):       Created by SHA256 hashing the code_verifier
                                     and base64 URL encoding the resulting hash
-        device_code_cmd (str):      Command used to generate the user and device
-                                    code using the Qiagen API
         user_code (str):            Code for registering device in QiaOAuth
         device_code (str):          Code for authorising the device
         outdir (str):               Directory for output files
@@ -38,45 +43,39 @@ class GetUserCode:
             Generate PKCE (Proof Key for Code Exchange) pair
         print_code_verifier()
             Return code_verifier for use in upload_to_qiagen.py
-        get_device_code_cmd()
-            Construct command used to generate the user and device code using
-            the Qiagen API
         generate_device_code()
-            Execute the command to generate the user and device code using
-            the Qiagen API
-        write_code_to_file()
-            Write code to output file
+            Generate the user and device code using the Qiagen API
+        write_codes_to_files()
+            Write the code_verifier, user_code and device_code to their output files
     """
 
-    def __init__(self, client_id: str, outdir: str, logger: logging.Logger):
+    def __init__(
+        self,
+        client_id: str,
+        outdir: str,
+        logger: logging.Logger,
+        session: requests.Session,
+    ):
         """
         Constructor for the GetUserCode class
-            :param client_id (str):     The client for which the code is requested
-                                        (provided by QIAGEN)
-            :param outdir (str):        Directory for output files
-            :param logger (object):     Python logging object
+            :param client_id (str):             The client for which the code is requested
+                                                (provided by QIAGEN)
+            :param outdir (str):                Directory for output files
+            :param logger (object):             Python logging object
+            :param session (requests.Session):  Session used to make the API calls
         """
         self.client_id = client_id
         self.logger = logger
+        self.session = session
         self.logger.info("Calling GetUserCode class")
         self.code_verifier, self.code_challenge = self.generate_pkce_pair()
-        self.device_code_cmd = self.get_device_code_cmd()
         self.user_code, self.device_code = self.generate_device_code()
         self.outdir = outdir
-        self.code_verifier_file = os.path.join(
-            self.outdir, f"qiagen_code_verifier_{config.TIMESTAMP}"
-        )
-        self.user_code_file = os.path.join(
-            self.outdir, f"qiagen_user_code_{config.TIMESTAMP}"
-        )
-        self.device_code_file = os.path.join(
-            self.outdir, f"qiagen_device_code_{config.TIMESTAMP}"
-        )
-        self.write_code_to_file(
-            self.code_verifier_file, "code_verifier", self.code_verifier
+        self.code_verifier_file, self.user_code_file, self.device_code_file = (
+            os.path.join(self.outdir, f"qiagen_{kind}_{config.TIMESTAMP}")
+            for kind in ("code_verifier", "user_code", "device_code")
         )
-        self.write_code_to_file(self.user_code_file, "user_code", self.user_code)
-        self.write_code_to_file(self.device_code_file, "device_code", self.device_code)
+        self.write_codes_to_files()
 
     def generate_pkce_pair(self) -> (str, str):
         """
@@ -86,70 +85,61 @@ class GetUserCode:
             :return code_challenge (str):   Code challenge,  created by SHA256 hashing the
                                             code_verifier and base64 URL encoding the resulting hash
         """
-        try:
-            self.logger.info("Generating code_verifier and code_challenge pkce pair")
-            code_verifier, code_challenge = pkce.generate_pkce_pair()
-            return code_verifier, code_challenge
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when generating pkce code_verifier "
-                f"and code_challenge pair: {exception}",
-            )
-            sys.exit(1)
+        self.logger.info("Generating code_verifier and code_challenge pkce pair")
+        code_verifier = secrets.token_urlsafe(96)[:128]
+        digest = hashlib.sha256(code_verifier.encode("ascii")).digest()
+        code_challenge = base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+        return code_verifier, code_challenge
 
-    def get_device_code_cmd(self) -> None:
+    def generate_device_code(self) -> (str, str):
         """
-        Construct command used to generate the user and device code using the Qiagen API
-            :return None:
-        """
-        try:
-            self.logger.info("Creating the device code generation command")
-            return (
-                'curl -i -X POST -H \'Content-Type: application/json\' -d \'{"client_id": "%s", '
-                '"code_challenge": "%s", "code_challenge_method": "S256"}\' '
-                "'https://apps.qiagenbioinformatics.eu/qiaoauth/oauth/device/code'"
-            ) % (self.client_id, self.code_challenge)
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when creating the device code "
-                f"generation command: {exception}",
-            )
-            sys.exit(1)
-
-    def generate_device_code(self) -> None:
-        """
-        Execute the command to generate the user and device code using the Qiagen API
-            :return None:
+        Generate the user and device code using the Qiagen API
+            :return user_code (str):    Code for registering device in QiaOAuth
+            :return device_code (str):  Code for authorising the device
         """
         try:
             self.logger.info("Generating device code and user code")
-            out = toolbox.execute_subprocess_command(self.device_code_cmd, self.logger)
-            self.logger.info(
-                "Device code and user code generation command was successful"
+            response = self.session.post(
+                DEVICE_CODE_URL,
+                json={
+                    "client_id": self.client_id,
+                    "code_challenge": self.code_challenge,
+                    "code_challenge_method": "S256",
+                },
+                timeout=60,
             )
+            out = toolbox.check_response(response, self.logger)
+            self.logger.info("Device code and user code generation was successful")
             return out["userCode"], out["deviceCode"]
         except Exception as exception:
             self.logger.exception(
                 "An exception was encountered when generating the device code "
-                f"and user code: {exception}",
+                "and user code: %s",
+                exception,
             )
             sys.exit(1)
 
-    def write_code_to_file(self, file_path: str, code_type: str, code: str) -> None:
+    def write_codes_to_files(self) -> None:
         """
-        Write code to output file
-            :param file_path (str): Path of file to output the code to
-            :param code_type (str): Type of code, for use in log messages
-            :param code (str):      Code string, to write to file
+        Write the code_verifier, user_code and device_code to their output files
+            :return None:
         """
-        try:
-            with open(file_path, "w", encoding="utf-8") as output:
-                self.logger.info(f"Writing {code_type} to output file {file_path}")
-                output.write(code)
-                self.logger.info(f"{code_type} successfully written to output file")
-        except Exception as exception:
-            self.logger.exception(
-                f"An exception was encountered when writing {code_type} "
-                f"to output file {file_path}: {exception}",
-            )
-            sys.exit(1)
+        for file_path, code_type, code in (
+            (self.code_verifier_file, "code_verifier", self.code_verifier),
+            (self.user_code_file, "user_code", self.user_code),
+            (self.device_code_file, "device_code", self.device_code),
+        ):
+            try:
+                self.logger.info("Writing %s to output file %s", code_type, file_path)
+                with open(file_path, "w", encoding="utf-8") as output:
+                    output.write(code)
+            except OSError as exception:
+                self.logger.exception(
+                    "An exception was encountered when writing %s "
+                    "to output file %s: %s",
+                    code_type,
+                    file_path,
+                    exception,
+                )
+                sys.exit(1)
+        self.logger.info("Codes successfully written to output files")
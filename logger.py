@@ -6,19 +6,40 @@ Log messages using the python standard library logging module.
 import sys
 import re
 import logging
+import logging.handlers
 import config
 
-
-class SensitiveFormatter(logging.Formatter):
+# Single pattern matching all sensitive information in log messages, so each
+# message is scanned once. The replacement is looked up by the matched group name
+_SENSITIVE = re.compile(
+    r"(?P<basic>Basic [^ ]+ )"
+    r"|(?P<device_code>device_code=[^ ]+&)"
+    r"|(?P<code_verifier>code_verifier=[^ ]+' )"
+    r'|(?P<authorization>Authorization: [^ ]+" )'
+    r'|(?P<client_id>"client_id": [^ ]+, )'
+    r'|(?P<code_challenge>"code_challenge": [^ ]+, )'
+)
+_REPLACEMENTS = {
+    "basic": "Basic <MASKED_KEY> ",
+    "device_code": "device_code=<MASKED_KEY>&",
+    "code_verifier": "code_verifier=<MASKED_KEY>' ",
+    "authorization": 'Authorization: <MASKED_KEY>" ',
+    "client_id": '"client_id": <MASKED_KEY>, ',
+    "code_challenge": '"code_challenge": <MASKED_KEY>, ',
+}
+
+
+class SensitiveFilter(logging.Filter):
     """
-    Formatter that removes sensitive information in logs. Inherits the properties and
-    methods from logging.Formatter
+    Filter that removes sensitive information in logs. Inherits the properties and
+    methods from logging.Filter. Attached to the logger so that each record is
+    filtered once, rather than once per handler
 
     Methods
         _filter()
             Filter out the auth key with regex
-        format()
-            Format the the record using logging.Formatter and _filter
+        filter()
+            Replace the record message and exception text with the filtered text
     """
 
     @staticmethod
@@ -28,30 +49,21 @@ class SensitiveFormatter(logging.Formatter):
             :param message (str):   Message to be filtered
             :return (str):          Filtered log message
         """
-        message = re.sub(r"Basic [^ ]+ ", r"Basic <MASKED_KEY> ", message)
-        message = re.sub(r"device_code=[^ ]+&", r"device_code=<MASKED_KEY>&", message)
-        message = re.sub(
-            r"code_verifier=[^ ]+' ", r"code_verifier=<MASKED_KEY>' ", message
-        )
-        message = re.sub(
-            r'Authorization: [^ ]+" ', r'Authorization: <MASKED_KEY>" ', message
-        )
-        message = re.sub(
-            r'"client_id": [^ ]+, ', r'"client_id": <MASKED_KEY>, ', message
-        )
-        message = re.sub(
-            r'"code_challenge": [^ ]+, ', r'"code_challenge": <MASKED_KEY>, ', message
-        )
-        return message
+        return _SENSITIVE.sub(lambda match: _REPLACEMENTS[match.lastgroup], message)
 
-    def format(self, record: logging.LogRecord) -> str:
+    def filter(self, record: logging.LogRecord) -> bool:
         """
-        Format the the record using _filter
+        Replace the record message and exception text with the filtered text
             :param record (logging.LogRecord):  Object to be logged
-            :return (str):                      Formatted filtered log message
+            :return (bool):                     True, so that the record is logged
         """
-        original = logging.Formatter.format(self, record)  # Call parent method
-        return self._filter(original)
+        record.msg = self._filter(record.getMessage())
+        record.args = ()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._filter(
+                logging.Formatter().formatException(record.exc_info)
+            )
+        return True
 
 
 class Logger(object):
@@ -59,7 +71,8 @@ class Logger(object):
     Simple logging class
 
     Attributes
-        logger (object):    Python logging object
+        formatter (logging.Formatter):  Formatter shared by all handlers
+        logger (object):                Python logging object
 
     Methods
         shutdown_logs()
@@ -67,6 +80,8 @@ class Logger(object):
             remove all handlers for all log files with a python logging object
         _get_file_handler()
             Returns the FileHandler associated with the logging object
+        _get_memory_handler()
+            Returns the MemoryHandler buffering records for the FileHandler
         _get_logging_formatter()
             Get formatter for logging. This is script mode-dependent
         _get_stream_handler()
@@ -80,16 +95,23 @@ class Logger(object):
         Constructor for the Logger class
             :param logfile_path (str): Logfile path
         """
+        self.formatter = logging.Formatter(self._get_logging_formatter())
         self.logger = self.get_logger("logger", logfile_path)
 
     def shutdown_logs(self) -> None:
         """
         To prevent duplicate filehandlers and system handlers close and
-        remove all handlers for all log files that have a python logging object
+        remove all handlers for all log files that have a python logging object.
+        Filters are also removed so they are not duplicated by the next Logger
             :return None:
         """
+        for log_filter in self.logger.filters[:]:
+            self.logger.removeFilter(log_filter)
         for handler in self.logger.handlers[:]:
             self.logger.removeHandler(handler)
+            if isinstance(handler, logging.handlers.MemoryHandler):
+                handler.flush()
+                handler.target.close()
             handler.close()
 
     def _get_file_handler(self, filepath: str) -> logging.FileHandler:
@@ -99,10 +121,26 @@ class Logger(object):
         """
         file_handler = logging.FileHandler(filepath, mode="a", delay=True)
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(SensitiveFormatter(self._get_logging_formatter()))
+        file_handler.setFormatter(self.formatter)
         file_handler.name = "file_handler"
         return file_handler
 
+    def _get_memory_handler(self, filepath: str) -> logging.handlers.MemoryHandler:
+        """
+        Returns the MemoryHandler buffering records for the FileHandler, so that
+        records are written to the logfile in batches rather than one write per
+        record. The buffer is flushed when full, on any ERROR record, and on shutdown
+            :return memory_handler (obj):   MemoryHandler object
+        """
+        memory_handler = logging.handlers.MemoryHandler(
+            capacity=512,
+            flushLevel=logging.ERROR,
+            target=self._get_file_handler(filepath),
+        )
+        memory_handler.setLevel(logging.DEBUG)
+        memory_handler.name = "memory_handler"
+        return memory_handler
+
     def _get_logging_formatter(self) -> str:
         """
         Get formatter for logging. This is script mode-dependent
@@ -117,7 +155,7 @@ class Logger(object):
         """
         stream_handler = logging.StreamHandler(sys.stdout)
         stream_handler.setLevel(logging.DEBUG)
-        stream_handler.setFormatter(SensitiveFormatter(self._get_logging_formatter()))
+        stream_handler.setFormatter(self.formatter)
         stream_handler.name = "stream_handler"
         return stream_handler
 
@@ -131,7 +169,8 @@ class Logger(object):
         logger = logging.getLogger(name)
         logger.filepath = filepath
         logger.setLevel(logging.DEBUG)
-        logger.addHandler(self._get_file_handler(filepath))
+        logger.addFilter(SensitiveFilter())
+        logger.addHandler(self._get_memory_handler(filepath))
         logger.addHandler(self._get_stream_handler())
         logger.timestamp = config.TIMESTAMP
         return logger
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+""" __init__.py
+
+Create the sample ZIP and upload it to QCII. run() can be called repeatedly from a
+long-running Python process to upload multiple samples, reusing the shared requests
+Session and the cached git tag, without paying the import and argument parsing
+cost per sample. run_batch() builds the ZIPs for multiple samples in parallel
+worker processes, then uploads them in turn. A failed sample raises UploadError
+rather than exiting the calling process
+"""
+import os
+from logger import Logger
+import config
+import toolbox
+
+
+class UploadError(Exception):
+    """
+    Raised when a sample ZIP cannot be created or uploaded. The cause is written to
+    the sample logfile
+    """
+
+
+def _get_sample_logger(sample_name: str) -> Logger:
+    """
+    Return a Logger writing to the logfile for the sample
+        :param sample_name (str):   Sample name
+        :return (Logger):           Logger for the sample
+    """
+    from . import qiagen_upload  # Imported here so that --help stays fast
+
+    os.makedirs(qiagen_upload.OUTDIR, exist_ok=True)
+    logfile_path = os.path.join(
+        qiagen_upload.OUTDIR, f"qiagen_upload.{sample_name}.{config.TIMESTAMP}.log"
+    )
+    return Logger(logfile_path)
+
+
+def create_sample_zip(sample_name: str, sample_path: str) -> str:
+    """
+    Create the sample ZIP and XML for upload to QCII
+        :param sample_name (str):   Sample name
+        :param sample_path (str):   Zipped folder containing variant files
+        :return (str):              Path to final zip for upload to QCII
+        :raises UploadError:        If the sample zip cannot be created
+    """
+    from . import qiagen_upload  # Imported here so that --help stays fast
+
+    logger_obj = _get_sample_logger(sample_name)
+    try:
+        logger_obj.logger.info(
+            "Running qiagen_upload %s - qiagen_upload", toolbox.git_tag()
+        )
+        create_zip = qiagen_upload.CreateZIP(
+            sample_name, sample_path, logger_obj.logger
+        )
+        return create_zip.output_zip
+    except SystemExit as exception:
+        # CreateZIP logs the error and exits, which must not end the caller's process
+        raise UploadError(
+            f"Failed to create the sample zip for {sample_name}"
+        ) from exception
+    finally:
+        logger_obj.shutdown_logs()
+
+
+def upload_sample_zip(
+    sample_name: str,
+    output_zip: str,
+    client_id: str,
+    client_secret: str,
+    code_verifier: str,
+    device_code: str,
+) -> None:
+    """
+    Generate the access token and upload the sample ZIP file to QCII
+        :param sample_name (str):   Sample name
+        :param output_zip (str):    Path to final zip for upload to QCII
+        :param client_id (str):     Client ID provided by Qiagen
+        :param client_secret (str): Client secret provided by Qiagen
+        :param code_verifier (str): Code verifier generated when obtaining the user code
+        :param device_code (str):   Device code generated when obtaining the user code
+        :return None:
+        :raises UploadError:        If the sample zip cannot be uploaded
+    """
+    from . import qiagen_upload  # Imported here so that --help stays fast
+
+    logger_obj = _get_sample_logger(sample_name)
+    try:
+        qiagen_upload.UploadToQiagen(
+            client_id,
+            client_secret,
+            code_verifier,
+            device_code,
+            output_zip,
+            logger_obj.logger,
+            toolbox.http_session(),
+        )
+    except SystemExit as exception:
+        # UploadToQiagen logs the error and exits, which must not end the caller's
+        # process
+        raise UploadError(
+            f"Failed to upload the sample zip for {sample_name}"
+        ) from exception
+    finally:
+        logger_obj.shutdown_logs()
+
+
+def run(
+    sample_name: str,
+    sample_path: str,
+    client_id: str,
+    client_secret: str,
+    code_verifier: str,
+    device_code: str,
+) -> None:
+    """
+    Create the sample ZIP and XML, generate the access token, and upload the sample
+    ZIP file to QCII
+        :param sample_name (str):   Sample name
+        :param sample_path (str):   Zipped folder containing variant files
+        :param client_id (str):     Client ID provided by Qiagen
+        :param client_secret (str): Client secret provided by Qiagen
+        :param code_verifier (str): Code verifier generated when obtaining the user code
+        :param device_code (str):   Device code generated when obtaining the user code
+        :return None:
+        :raises UploadError:        If the sample zip cannot be created or uploaded
+    """
+    output_zip = create_sample_zip(sample_name, sample_path)
+    upload_sample_zip(
+        sample_name, output_zip, client_id, client_secret, code_verifier, device_code
+    )
+
+
+def run_batch(
+    samples: list,
+    client_id: str,
+    client_secret: str,
+    code_verifier: str,
+    device_code: str,
+    max_workers: int = None,
+) -> None:
+    """
+    Create the sample ZIPs in parallel worker processes, then upload each sample ZIP
+    file to QCII from this process. Uploads are made in turn so that they share the
+    requests Session and the cached access token. A sample that fails does not stop
+    the batch: every sample ZIP that was created is uploaded, and the failed samples
+    are reported at the end
+        :param samples (list):      List of (sample name, zipped folder containing
+                                    variant files) tuples
+        :param client_id (str):     Client ID provided by Qiagen
+        :param client_secret (str): Client secret provided by Qiagen
+        :param code_verifier (str): Code verifier generated when obtaining the user code
+        :param device_code (str):   Device code generated when obtaining the user code
+        :param max_workers (int):   Maximum number of worker processes. Defaults to
+                                    the number of CPUs
+        :return None:
+        :raises ValueError:         If a sample name appears more than once
+        :raises UploadError:        Naming the samples that could not be created or
+                                    uploaded, once all other samples are uploaded
+    """
+    # Imported here so that --help does not pay for importing multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    sample_names = [sample_name for sample_name, _ in samples]
+    duplicates = {name for name in sample_names if sample_names.count(name) > 1}
+    if duplicates:
+        # Workers for the same sample would write the same output zip and logfile
+        raise ValueError(
+            f"Duplicate sample names in batch: {', '.join(sorted(duplicates))}"
+        )
+    output_zips = {}
+    failed = set()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(create_sample_zip, sample_name, sample_path): sample_name
+            for sample_name, sample_path in samples
+        }
+        for future in as_completed(futures):
+            try:
+                output_zips[futures[future]] = future.result()
+            except (SystemExit, Exception):
+                failed.add(futures[future])
+    for sample_name in sample_names:
+        if sample_name not in output_zips:
+            continue
+        try:
+            upload_sample_zip(
+                sample_name,
+                output_zips[sample_name],
+                client_id,
+                client_secret,
+                code_verifier,
+                device_code,
+            )
+        except (SystemExit, Exception):
+            failed.add(sample_name)
+    if failed:
+        raise UploadError(
+            "Failed to create or upload samples: "
+            + ", ".join(name for name in sample_names if name in failed)
+        )
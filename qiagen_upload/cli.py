@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+""" cli.py
+
+Command line interface for qiagen_upload
+"""
+import sys
+import argparse
+import toolbox
+from . import run, UploadError
+
+
+def arg_parse(argv: list = None) -> dict:
+    """
+    Parse arguments supplied by the command line. Create argument parser, define command
+    line arguments, then parse supplied command line arguments using the created
+    argument parser
+        :param argv (list): Command line arguments. Defaults to sys.argv[1:]
+        :return (dict):     Parsed command line attributes
+    """
+    info_string = (
+        "Create sample ZIP and XML, generate access token, and "
+        "upload sample ZIP file to QCII"
+    )
+    parser = argparse.ArgumentParser(
+        description=info_string,
+        usage=info_string,
+    )
+    parser.add_argument(
+        "-S",
+        "--sample_name",
+        type=str,
+        help="Sample name string",
+        required=True,
+    )
+    parser.add_argument(
+        "-Z",
+        "--sample_path",
+        type=toolbox.is_valid_file,
+        help="Zipped folder containing variant files",
+        required=True,
+    )
+    parser.add_argument(
+        "-CI",
+        "--client_id",
+        type=str,
+        help="Client ID provided by Qiagen",
+        required=True,
+    )
+    parser.add_argument(
+        "-CS",
+        "--client_secret",
+        type=str,
+        help="Client secret provided by Qiagen",
+        required=True,
+    )
+    parser.add_argument(
+        "-C",
+        "--code_verifier",
+        type=str,
+        help="Code verifier generated when obtaining the user code",
+        required=True,
+    )
+    parser.add_argument(
+        "-D",
+        "--device_code",
+        type=str,
+        help="Device code generated when obtaining the user code",
+        required=True,
+    )
+    return vars(parser.parse_args(argv))
+
+
+def main(argv: list = None) -> None:
+    """
+    Parse command line arguments and run qiagen_upload for the sample
+        :param argv (list): Command line arguments. Defaults to sys.argv[1:]
+        :return None:
+    """
+    try:
+        run(**arg_parse(argv))
+    except UploadError:
+        sys.exit(1)  # The error has already been written to the sample logfile
@@ -4,14 +4,67 @@
 Upload the zip file containing the XML file to QCII
 """
 import sys
+import time
 import base64
-import xml.etree.ElementTree as etree
 import os
+import re
+import queue
 import shutil
+import stat
+import struct
 import zipfile
+import zlib
 import logging
+import typing
+from xml.sax.saxutils import escape
 import toolbox
 
+if typing.TYPE_CHECKING:
+    import requests
+
+# Qiagen API endpoints used to generate the access token and upload the sample
+ACCESS_TOKEN_URL = "https://apps.qiagenbioinformatics.eu/qiaoauth/oauth/token"
+SAMPLE_UPLOAD_URL = "https://api.qiagenbioinformatics.eu/v2/sample"
+
+# zlib level used when deflating members of the output zip. Level 6 is pinned, as
+# higher levels are several times slower for a marginal size gain on VCF/TSV text
+ZIP_COMPRESSLEVEL = 6
+
+# Pool of reusable 1 MiB buffers for copying zip member data, so that a new buffer
+# is not allocated for each read
+_COPY_BUFFERS = queue.LifoQueue()
+
+# Directory for output files, resolved once at import
+OUTDIR = os.path.join(os.getcwd(), "outputs")
+
+# XML template for the QCII sample upload, read once at import. Contains the
+# {sample_name} and {variants_filenames} placeholders
+with open(
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+        "templates",
+        "sample_upload_template.xml",
+    ),
+    encoding="utf-8",
+) as template:
+    XML_TEMPLATE = template.read()
+
+# Access tokens generated in this process, keyed by (encoded client ID, device code),
+# with values of (access token, expiry time). Lets repeated uploads reuse a token
+_ACCESS_TOKENS = {}
+
+
+def _get_copy_buffer() -> bytearray:
+    """
+    Take a buffer from the pool of copy buffers, creating one if the pool is empty.
+    The buffer should be returned to _COPY_BUFFERS once used
+        :return (bytearray):    1 MiB copy buffer
+    """
+    try:
+        return _COPY_BUFFERS.get_nowait()
+    except queue.Empty:
+        return bytearray(1 << 20)
+
 
 class CreateZIP:
     """
@@ -24,20 +77,20 @@ class CreateZIP:
         files_to_keep (list):           List of substrings matching the names of
                                         files required in the TSO zip for upload
                                         to QCII
-        xml_path (str):                 Path of XML file created by the script
-        xml_name (str):                 Name of xml file created by the script
+        files_to_keep_regex (object):   Compiled regex matching any of the
+                                        files_to_keep substrings
+        xml (str):                      XML metadata created by the script
+        xml_name (str):                 Name of xml file in the output zip
         outdir (str):                   Path to output directory
-        outdir_sample_folder (str):     Path to unzipped TSO sample directory
         output_zip (str):               Path to final zip for upload to QCII
 
     Methods
-        extract_zip_contents()
-            Extract contents of input sample zip
         write_output_zip()
             Create new output zip file, containing only the files required for upload
-            to QCII (files in self. per self.files_to_keep, plus output XML file)
-        remove_intermediary_files()
-            Remove intermediary files that are not required for the script output
+            to QCII (files in the sample folder of the input zip per
+            self.files_to_keep, plus output XML file)
+        copy_member(src, info, zip_ref, arcname)
+            Copy a member of the input zip into the output zip under a new name
     """
 
     def __init__(
@@ -58,114 +111,175 @@ class CreateZIP:
             "CombinedVariantOutput.tsv",
             "MergedSmallVariants.genome.vcf",
         ]
+        self.files_to_keep_regex = re.compile(
+            "|".join(re.escape(filename) for filename in self.files_to_keep)
+        )
         xml_obj = CreateXML(sample_name, self.logger)
-        self.xml_path = xml_obj.xml_outfile
+        self.xml = xml_obj.xml
         self.xml_name = xml_obj.xml_name
-        self.outdir = os.path.join(os.getcwd(), "outputs")
-        self.outdir_sample_folder = os.path.join(self.outdir, self.sample_name)
+        self.outdir = OUTDIR
         self.output_zip = os.path.join(self.outdir, f"{self.sample_name}.zip")
-        self.extract_zip_contents()
         self.write_output_zip()
-        self.remove_intermediary_files()
-
-    def extract_zip_contents(self) -> None:
-        """
-        Extract contents of input sample zip
-            :return None:
-        """
-        try:
-            self.logger.info("Unzipping the sample zip folder")
-            with zipfile.ZipFile(self.sample_zip_folder, mode="r") as archive:
-                for file in archive.namelist():
-                    archive.extract(file, self.outdir)
-        except Exception as exception:
-            self.logger.exception(
-                f"An exception was encountered when unzipping the sample zip folder: {exception}",
-            )
-            sys.exit(1)
 
     def write_output_zip(self) -> None:
         """
         Create new output zip file, containing only the files required for upload
-        to QCII (files in self. per self.files_to_keep, plus output XML file)
+        to QCII (files in the sample folder of the input zip per self.files_to_keep,
+        plus output XML file). Files are streamed from the input zip straight into
+        the output zip, without being extracted to disk, and the XML is written
+        from memory. The output zip is deflated, as the text VCF and TSV files
+        compress well, reducing the upload size
             :return None:
         """
         try:
-            with zipfile.ZipFile(self.output_zip, "w") as zip_ref:
-                to_zip = os.listdir(self.outdir_sample_folder)
-                for file in to_zip:
-                    if any(filename in file for filename in self.files_to_keep):
-                        self.logger.info(f"Adding file to zip file for upload: {file}")
-                        filepath = os.path.join(self.outdir_sample_folder, file)
-                        zip_ref.write(filepath, arcname=file)
+            self.logger.info("Copying the required files from the sample zip folder")
+            with (
+                zipfile.ZipFile(self.sample_zip_folder, mode="r") as src,
+                zipfile.ZipFile(
+                    self.output_zip,
+                    "w",
+                    compression=zipfile.ZIP_DEFLATED,
+                    compresslevel=ZIP_COMPRESSLEVEL,
+                ) as zip_ref,
+            ):
+                for info in src.infolist():
+                    folder, file = os.path.split(info.filename)
+                    if info.is_dir() or folder != self.sample_name:
+                        continue
+                    if self.files_to_keep_regex.search(file):
+                        self.logger.info("Adding file to zip file for upload: %s", file)
+                        self.copy_member(src, info, zip_ref, file)
                     else:
-                        self.logger.info(f"File is not required in TSO upload: {file}")
-                zip_ref.write(self.xml_path, arcname=self.xml_name)
+                        self.logger.info("File is not required in TSO upload: %s", file)
+                # Mark the XML as a regular file with rw-r--r-- permissions
+                xml_info = zipfile.ZipInfo(
+                    self.xml_name, date_time=time.localtime(time.time())[:6]
+                )
+                xml_info.external_attr = (stat.S_IFREG | 0o644) << 16
+                zip_ref.writestr(
+                    xml_info,
+                    self.xml,
+                    compress_type=zipfile.ZIP_DEFLATED,
+                    compresslevel=ZIP_COMPRESSLEVEL,
+                )
         except Exception as exception:
             self.logger.exception(
-                f"An exception was encountered when creating the zip folder for upload: {exception}",
+                "An exception was encountered when creating the zip folder "
+                "for upload: %s",
+                exception,
             )
             sys.exit(1)
 
-    def remove_intermediary_files(self) -> None:
-        """
-        Remove intermediary files that are not required for the script output
+    def copy_member(
+        self,
+        src: zipfile.ZipFile,
+        info: zipfile.ZipInfo,
+        zip_ref: zipfile.ZipFile,
+        arcname: str,
+    ) -> None:
+        """
+        Copy a member of the input zip into the output zip under a new name. Members
+        that are already deflated have their compressed bytes copied as they are,
+        skipping the recompression. The copied bytes are still decompressed to check
+        their CRC-32, so that a corrupt input member is not uploaded. Other members
+        are streamed through and deflated
+            :param src (zipfile.ZipFile):       Input sample zip
+            :param info (zipfile.ZipInfo):      Member of the input zip to copy
+            :param zip_ref (zipfile.ZipFile):   Output zip
+            :param arcname (str):               Name of the member in the output zip
             :return None:
         """
-        try:
-            self.logger.info("Removing intermediary xml file")
-            os.remove(self.xml_path)
-            self.logger.info("Removing intermediary unzipped sample directory")
-            shutil.rmtree(self.outdir_sample_folder)
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when removing intermediary "
-                f"files: {exception}"
+        zinfo = zipfile.ZipInfo(arcname, date_time=info.date_time)
+        zinfo.file_size = info.file_size
+        # Keep the Unix mode of the input member, held in the high 16 bits. Members
+        # created on DOS or Windows have none, so default to a regular file with
+        # rw-r--r-- permissions, as the output ZipInfo is marked as created on Unix
+        if info.external_attr >> 16:
+            zinfo.external_attr = info.external_attr
+        else:
+            zinfo.external_attr = (stat.S_IFREG | 0o644) << 16
+        # Flag bit 0x1 marks an encrypted member, which cannot be copied as is
+        if info.compress_type != zipfile.ZIP_DEFLATED or info.flag_bits & 0x1:
+            zinfo.compress_type = zip_ref.compression
+            # ZipFile.open does not apply the archive compresslevel to a ZipInfo
+            # passed in, so set it as ZipFile.write does
+            zinfo._compresslevel = ZIP_COMPRESSLEVEL
+            with src.open(info) as fin, zip_ref.open(zinfo, "w") as fout:
+                shutil.copyfileobj(fin, fout, length=1 << 20)
+            return
+        zinfo.compress_type = info.compress_type
+        zinfo.compress_size = info.compress_size
+        zinfo.CRC = info.CRC
+        # Skip the local file header of the input member to reach its data. The
+        # header is followed by the filename and extra field, with lengths given by
+        # its last two fields
+        src.fp.seek(info.header_offset)
+        header = struct.unpack(
+            zipfile.structFileHeader, src.fp.read(zipfile.sizeFileHeader)
+        )
+        if header[0] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(
+                f"Bad magic number for file header: {info.filename}"
             )
-            sys.exit(1)
+        src.fp.seek(header[-2] + header[-1], os.SEEK_CUR)
+        zinfo.header_offset = zip_ref.fp.tell()
+        zip_ref.fp.write(
+            zinfo.FileHeader(
+                zinfo.file_size > zipfile.ZIP64_LIMIT
+                or zinfo.compress_size > zipfile.ZIP64_LIMIT
+            )
+        )
+        # Raw deflate stream, as zip members have no zlib header
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        crc = 0
+        buffer = _get_copy_buffer()
+        try:
+            view = memoryview(buffer)
+            remaining = zinfo.compress_size
+            while remaining:
+                size = src.fp.readinto(view[: min(remaining, len(buffer))])
+                if not size:
+                    raise EOFError(f"Unexpected end of data for {info.filename}")
+                zip_ref.fp.write(view[:size])
+                # Inflate at most one buffer's worth at a time, so that highly
+                # compressed data is not expanded into memory all at once
+                data = view[:size]
+                while data:
+                    crc = zlib.crc32(decompressor.decompress(data, len(buffer)), crc)
+                    data = decompressor.unconsumed_tail
+                remaining -= size
+        finally:
+            _COPY_BUFFERS.put(buffer)
+        crc = zlib.crc32(decompressor.flush(), crc)
+        if crc != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+        zip_ref.filelist.append(zinfo)
+        zip_ref.NameToInfo[arcname] = zinfo
+        zip_ref.start_dir = zip_ref.fp.tell()
 
 
 class CreateXML:
     """
     Class to create the XML for the QCI sample upload. Qiagen requires an XML metadata
-    file for every sample uploaded via the API
+    file for every sample uploaded via the API. The XML is created by substituting
+    the sample values into the XML template, which holds the elements in the
+    alphabetical descending order expected by the QCII API
 
     Attributes
-        sample_name (str):                      Sample name
-        logger (object):                        Python logging object
-        xml_template (str):                     Path to XML template for QCI sample upload
-        combinedvariants_tsv (str):             Path to TSV CombinedVariantOutput file
-        copynumbervariants_vcf (str):           Path to VCF CopyNumberVariants file
-        mergedvariants_vcf (str):               Path to VCF MergedSmallVariants file
-        outdir (str):                           Directory for output files
-        xml_name (str):                         Name of xml file created by the script
-        xml_outfile (str):                      Path of XML file created by the script
-        variants_filenames (list):              List of filenames to be included in the
-                                                VariantsFilename subelement within the
-                                                VariantsFilenames subelement in the XML file
-        xml_root (etree.Element):               XML template data at root level
-        sample_element (etree.Element):         XML Sample element
-        variantsfilenames_sub (etree.Element):  XML VariantsFilenames element
+        sample_name (str):              Sample name
+        logger (object):                Python logging object
+        combinedvariants_tsv (str):     Path to TSV CombinedVariantOutput file
+        copynumbervariants_vcf (str):   Path to VCF CopyNumberVariants file
+        mergedvariants_vcf (str):       Path to VCF MergedSmallVariants file
+        xml_name (str):                 Name of xml file created by the script
+        variants_filenames (list):      List of filenames to be included in the
+                                        VariantsFilename subelement within the
+                                        VariantsFilenames subelement in the XML file
+        xml (str):                      Constructed XML
 
     Methods
-        import_xml_data()
-            Import XML data from template file, at root level
-        get_xml_element(element_name)
-            Extract an XML element from the xml root
-        get_sample_subelement()
-            Extract a subelement from within the sample element
-        add_sample_name()
-            Add sample name subelement to Sample element
-        add_sample_subjectid()
-            Add subject ID subelement to Sample element
-        add_variants_filenames()
-            Add VariantsFilename subelement to XML for each file that requires upload to
-            QCII for the sample
-        order_elements()
-            Order elements so that they are in alphabetical descending order, as expected by
-            the QCII API
-        write_to_outfile()
-            Write constructed XML to output file
+        build_xml()
+            Substitute the sample name and variants filenames into the XML template
     """
 
     def __init__(self, sample_name: str, logger: logging.Logger):
@@ -174,186 +288,37 @@ class CreateXML:
             :param sample_name (str):   Name of sample for upload
             :param logger (object):     Python logging object
         """
-        etree.register_namespace("", "http://qci.qiagen.com/xsd/interpret")
         self.sample_name = sample_name
         self.logger = logger
         self.logger.info("Calling CreateXML class")
-        self.xml_template = os.path.join(
-            os.getcwd(), "templates", "sample_upload_template.xml"
-        )
         self.combinedvariants_tsv = f"{self.sample_name}_CombinedVariantOutput.tsv"
         self.copynumbervariants_vcf = f"{self.sample_name}_CopyNumberVariants.vcf"
         self.mergedvariants_vcf = f"{self.sample_name}_MergedSmallVariants.genome.vcf"
-        self.outdir = os.path.join(os.getcwd(), "outputs")
         self.xml_name = f"{self.sample_name}.xml"
-        self.xml_outfile = os.path.join(self.outdir, self.xml_name)
         self.variants_filenames = [
             self.combinedvariants_tsv,
             self.copynumbervariants_vcf,
             self.mergedvariants_vcf,
         ]
-        self.xml_root = self.import_xml_data()
-        self.sample_element = self.get_xml_element("Sample")
-        self.variantsfilenames_sub = self.get_sample_subelement("VariantsFilenames")
-        self.add_sample_name()
-        self.add_sample_subjectid()
-        self.add_variants_filenames()
-        self.order_elements()
-        self.write_to_outfile()
-
-    def import_xml_data(self) -> etree.Element:
-        """
-        Import XML data from template file, at root level
-            :return etree.Element object:   XML template data at root level
-        """
-        try:
-            self.logger.info("Getting XML template root")
-            return etree.parse(self.xml_template).getroot()
-        except Exception as exception:
-            self.logger.exception(
-                f"An exception was encountered when getting XML template root: {exception}",
-            )
-            sys.exit(1)
+        self.xml = self.build_xml()
 
-    def get_xml_element(self, element_name) -> etree.Element:
+    def build_xml(self) -> str:
         """
-        Extract an XML element from the xml root
-            :param element_name (str):  Name of element to be extracted
-            :return (etree.Element):    XML Sample element
+        Substitute the sample name and variants filenames into the XML template
+            :return (str):  Constructed XML
         """
         try:
-            self.logger.info(f"Finding element {element_name} in XML template root")
-            return self.xml_root.find(
-                "{http://qci.qiagen.com/xsd/interpret}" + f"{element_name}"
+            self.logger.info("Building the XML from the XML template")
+            return XML_TEMPLATE.format(
+                sample_name=escape(self.sample_name),
+                variants_filenames="".join(
+                    f"<VariantsFilename>{escape(filename)}</VariantsFilename>"
+                    for filename in self.variants_filenames
+                ),
             )
         except Exception as exception:
             self.logger.exception(
-                f"An exception was encountered when finding element {element_name} in XML template root: {exception}",
-            )
-            sys.exit(1)
-
-    def get_sample_subelement(self, subelement) -> etree.Element:
-        """
-        Extract a subelement from within the sample element
-            :param subelement:              Name of subelement within the
-                                            XML Sample element
-            :return  etree.Element object:  XML VariantsFilenames element
-        """
-        try:
-            self.logger.info(
-                f"Finding subelement {subelement} within the XML Sample element"
-            )
-            return self.sample_element.find(
-                "{http://qci.qiagen.com/xsd/interpret}" + f"{subelement}"
-            )
-        except Exception as exception:
-            self.logger.exception(
-                f"An exception was encountered when extracting subelement {subelement} "
-                f"from within the sample element: {exception}",
-            )
-            sys.exit(1)
-
-    def add_sample_name(self) -> None:
-        """
-        Add sample name subelement to Sample element
-            :return None:
-        """
-        try:
-            self.logger.info("Adding the sample name subelement to the Sample element")
-            name_subelement = etree.SubElement(self.sample_element, "Name")
-            name_subelement.text = self.sample_name
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when adding the sample name "
-                f"subelement to the Sample element: {exception}",
-            )
-            sys.exit(1)
-
-    def add_sample_subjectid(self) -> None:
-        """
-        Add subject ID subelement to Sample element
-            :return None:
-        """
-        try:
-            self.logger.info("Adding subject ID subelement to the Sample element")
-            subjectid_subelement = etree.SubElement(self.sample_element, "SubjectId")
-            subjectid_subelement.text = self.sample_name
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when adding the subject ID "
-                f"subelement to the Sample element: {exception}"
-            )
-            sys.exit(1)
-
-    def add_variants_filenames(self) -> None:
-        """
-        Add VariantsFilename subelement to XML for each file that requires
-        upload to QCII for the sample
-            :return None:
-        """
-        try:
-            self.logger.info(
-                "Adding VariantsFilename subelements to the VariantsFilenames "
-                "subelement"
-            )
-            for filename in self.variants_filenames:
-                self.logger.info(f"Adding subelement {filename}")
-                VariantsFilename = etree.SubElement(
-                    self.variantsfilenames_sub, "VariantsFilename"
-                )
-                VariantsFilename.text = filename
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when adding the VariantsFilename "
-                f"subelements to the VariantsFilenames subelement: {exception}"
-            )
-            sys.exit(1)
-
-    def order_elements(self) -> None:
-        """
-        Order elements so that they are in alphabetical descending order,
-        as expected by the QCII API
-            :return None:
-        """
-        try:
-            self.logger.info(
-                "Sorting the first layer of elements in the XML into "
-                "alphabetical descending order"
-            )
-            self.xml_root[:] = sorted(
-                self.xml_root, key=lambda child: (child.tag, child.get("name"))
-            )
-            self.logger.info(
-                "Sorting the second layer of elements in the XML into "
-                "alphabetical descending order"
-            )
-            for c in self.xml_root:
-                c[:] = sorted(c, key=lambda child: (child.tag, child.get("desc")))
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when sorting the "
-                f"XML elements: {exception}"
-            )
-            sys.exit(1)
-
-    def write_to_outfile(self) -> None:
-        """
-        Write constructed XML to output file
-            :return None:
-        """
-        try:
-            self.logger.info(
-                f"Writing the constructed XMl to output file {self.xml_outfile}"
-            )
-            if not os.path.exists(self.outdir):
-                self.logger.info(f"Creating output dir: {self.outdir}")
-                os.mkdir(self.outdir)
-            with open(self.xml_outfile, "w", encoding="utf-8") as output:
-                output.write(etree.tostring(self.xml_root).decode())
-        except Exception as exception:
-            self.logger.exception(
-                "An exception was encountered when sorting the "
-                f"XML elements: {exception}"
+                "An exception was encountered when building the XML: %s", exception
             )
             sys.exit(1)
 
@@ -368,6 +333,7 @@ class UploadToQiagen:
         filepath_to_upload (str):   Path of sample zip file to upload
         sample_name (str):          Name of sample for upload
         logger (object):            Python logging object
+        session (requests.Session): Session used to make the API calls
         encoded_clientid (str):     Encoded client_id:client_secret as base64
         access_token (str):         QCII API access token
 
@@ -388,6 +354,7 @@ class UploadToQiagen:
         device_code: str,
         filepath_to_upload: str,
         logger: logging.Logger,
+        session: "requests.Session",
     ):
         """
         Constructor for the UploadToQiagen class
@@ -399,11 +366,13 @@ class UploadToQiagen:
             :param device_code (str):           Code for authorising the device
             :param filepath_to_upload (str):    Path of sample zip file to upload
             :param logger (object):             Python logging object
+            :param session (requests.Session):  Session used to make the API calls
         """
         self.code_verifier = code_verifier
         self.device_code = device_code
         self.filepath_to_upload = filepath_to_upload
         self.logger = logger
+        self.session = session
         self.logger.info("Calling UploadToQiagen class")
         self.encoded_clientid = self.encode_clientid(client_id, client_secret)
         self.access_token = self.generate_access_token()
@@ -426,52 +395,88 @@ class UploadToQiagen:
         except Exception as exception:
             self.logger.exception(
                 "An exception was encountered when encoding the "
-                f"client_id:secret as base64: {exception}"
+                "client_id:secret as base64: %s",
+                exception,
             )
             sys.exit(1)
 
     def generate_access_token(self) -> str:
         """
-        Generate access token for use in uploading samples
+        Generate access token for use in uploading samples. A token already generated
+        in this process for the same credentials is reused until shortly before it
+        expires
             :return (str):  QCII API access token
         """
         try:
-            self.logger.info("Building the access token generation command")
-            access_token_cmd = (
-                f'curl -i -X POST -H "Authorization: Basic {self.encoded_clientid}"'
-                " -d 'grant_type=urn:ietf:params:oauth:grant-type:device_code&device_code="
-                f"{self.device_code}&code_verifier={self.code_verifier}' "
-                "'https://apps.qiagenbioinformatics.eu/qiaoauth/oauth/token'"
+            cache_key = (self.encoded_clientid, self.device_code)
+            access_token, expires = _ACCESS_TOKENS.get(cache_key, (None, 0))
+            if time.time() < expires - 30:
+                self.logger.info("Reusing the cached access token")
+                return access_token
+            self.logger.info("Requesting the access token")
+            response = self.session.post(
+                ACCESS_TOKEN_URL,
+                headers={"Authorization": f"Basic {self.encoded_clientid}"},
+                data={
+                    "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
+                    "device_code": self.device_code,
+                    "code_verifier": self.code_verifier,
+                },
+                timeout=60,
+            )
+            out = toolbox.check_response(response, self.logger)
+            _ACCESS_TOKENS[cache_key] = (
+                out["access_token"],
+                time.time() + out.get("expires_in", 0),
             )
-            self.logger.info("Executing the access token generation command")
-            out = toolbox.execute_subprocess_command(access_token_cmd, self.logger)
             return out["access_token"]
         except Exception as exception:
             self.logger.exception(
-                "An exception was encountered when executing the access "
-                f"token generation command: {exception}"
+                "An exception was encountered when requesting the access token: %s",
+                exception,
             )
             sys.exit(1)
 
     def upload_sample(self) -> None:
         """
-        Make API call to upload sample to QCII
+        Make API call to upload sample to QCII. The multipart body is streamed from
+        the sample zip file rather than read into memory
             :return None:
         """
         try:
-            self.logger.info("Building the command to upload the sample to QCII")
-            sample_upload_cmd = (
-                'curl -X POST -H "Authorization: %s" -H "accept: application/json" -H '
-                '"Content-Type: multipart/form-data" -F "file=@%s;type=application/zip" '
-                '"https://api.qiagenbioinformatics.eu/v2/sample"'
-                % (self.access_token, self.filepath_to_upload)
-            )
-            self.logger.info("Executing the command to upload the sample to QCII")
-            toolbox.execute_subprocess_command(sample_upload_cmd, self.logger)
+            # Imported here so that building sample zips, as the run_batch workers
+            # do, does not pay for importing requests and requests-toolbelt
+            from requests_toolbelt.multipart.encoder import MultipartEncoder
+
+            self.logger.info("Uploading the sample to QCII")
+            # A 1 MiB buffer coalesces the small reads made while streaming the body
+            with open(self.filepath_to_upload, "rb", buffering=1 << 20) as sample_zip:
+                encoder = MultipartEncoder(
+                    fields={
+                        "file": (
+                            os.path.basename(self.filepath_to_upload),
+                            sample_zip,
+                            "application/zip",
+                        )
+                    }
+                )
+                response = self.session.post(
+                    SAMPLE_UPLOAD_URL,
+                    headers={
+                        "Authorization": self.access_token,
+                        "accept": "application/json",
+                        "Content-Type": encoder.content_type,
+                    },
+                    data=encoder,
+                    # (connect, read) timeouts apply per socket operation, so do not
+                    # limit the total time taken to stream a large upload
+                    timeout=(60, 600),
+                )
+            toolbox.check_response(response, self.logger)
             self.logger.info("Sample upload was successful")
         except Exception as exception:
             self.logger.error(
-                "An error was encountered when executing the QCII sample upload "
-                f"command: {exception}."
+                "An error was encountered when uploading the sample to QCII: %s.",
+                exception,
             )
             sys.exit(1)
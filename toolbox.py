@@ -6,38 +6,49 @@ This script contains functions used and imported across multiple modules
 
 import os
 import sys
+import functools
 import logging
-import subprocess
-import json
 import argparse
+import typing
 
+if typing.TYPE_CHECKING:
+    import requests
 
-def is_valid_file(parser: argparse.ArgumentParser, arg: str) -> str:
+# Shared requests Session, created on first call to http_session()
+_SESSION = None
+
+
+def is_valid_file(arg: str) -> str:
     """
-    Check file path is valid
-        :param parser (argparse.ArgumentParser):    Holds necessary info to parse cmd
-                                                    line into Python data types
-        :param arg (str):                           Input argument
-        :return (str):                              Input argument
+    Check file path is valid. For use as an argparse argument type
+        :param arg (str):   Input argument
+        :return (str):      Input argument
     """
     if not os.path.exists(arg):
-        parser.error(f"The file {arg} does not exist!")
+        raise argparse.ArgumentTypeError(f"The file {arg} does not exist!")
     else:
         return arg  # Return argument
 
 
+@functools.lru_cache(maxsize=1)
 def git_tag() -> str:
     """
-    Obtain git tag from current commit
+    Obtain git tag from current commit. Cached, as the tag does not change at runtime
         :return stdout (str):   String containing stdout,
                                 with newline characters removed
     """
+    import subprocess  # Imported here so that --help does not pay for the import
+
     filepath = os.path.dirname(os.path.realpath(__file__))
-    cmd = f"git -C {filepath} describe --tags"
 
-    proc = subprocess.Popen(
-        [cmd], stderr=subprocess.PIPE, stdout=subprocess.PIPE, shell=True
-    )
+    try:
+        proc = subprocess.Popen(
+            ["git", "-C", filepath, "describe", "--tags"],
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+    except OSError:  # git is not installed
+        return "[unversioned]"
     out, _ = proc.communicate()
     if out.decode("utf-8"):
         return out.rstrip().decode("utf-8")
@@ -45,40 +56,48 @@ def git_tag() -> str:
         return "[unversioned]"
 
 
-def check_for_error(proc: subprocess.Popen, logger: object) -> (str, str, int):
+def http_session() -> "requests.Session":
     """
-    Check for success returncode and write to log accordingly
-        :param proc (class):    subprocess.Popen class
-        :param logger (object): Logger
-        :return (stdout(str),
-        stderr(str))(tuple):    Stdout, stderr
+    Return the requests Session shared by all API calls, creating it on first use.
+    A single pooled connection is reused across the device code, access token and
+    sample upload requests, avoiding a new TCP connection and TLS handshake per call
+        :return (requests.Session): Shared requests Session
     """
-    out, err = proc.communicate()
-    out = json.loads(out.decode("utf-8").strip().splitlines()[-1])
-    err = err.decode("utf-8").strip()
-    if out.get("error") is None:
-        logger.info("Command was executed successfully with no error")
-        return out, err
-    else:
-        logger.info(f"Command failed. Stdout: {out}. Stderr: {err}")
-        sys.exit(1)
+    global _SESSION
+    if _SESSION is None:
+        # Imported here so that --help does not pay for importing requests
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=1),
+        )
+        _SESSION = requests.Session()
+        _SESSION.mount("https://", adapter)
+    return _SESSION
 
 
-def execute_subprocess_command(command: str, logger: logging.Logger) -> (str, str, int):
+def check_response(response: "requests.Response", logger: logging.Logger) -> dict:
     """
-    Execute a subprocess
-        :param command(str):            Input command
-        :param logger(logging.Logger):  Logger
-        :return (stdout(str),
-        stderr(str))(tuple):            Outputs from the command
+    Check the API response for an error and write to log accordingly
+        :param response (requests.Response):    Response returned by the API call
+        :param logger (logging.Logger):         Logger
+        :return (dict):                         Parsed JSON response body
     """
-    logger.info(f"Executing command: {command}")
-    proc = subprocess.Popen(
-        [command],
-        stderr=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        shell=True,
-        executable="/bin/bash",
+    if response.ok:
+        try:
+            out = response.json()
+        except ValueError:  # Body is not JSON, e.g. an HTML error page from a proxy
+            out = None
+        if isinstance(out, dict) and out.get("error") is None:
+            logger.info("Request was executed successfully with no error")
+            return out
+    logger.info(
+        "Request failed. Status code: %s. Response: %s",
+        response.status_code,
+        response.text,
     )
-    out, err = check_for_error(proc, logger)  # Capture the streams
-    return out
+    sys.exit(1)